@@ -6,6 +6,7 @@
 # - Exports a screenshot of the project (optional)
 # - Exports component bodies as .stl (optional)
 # - Exports component sketches as .dxf (optional)
+# - Writes an empty <design>.exported marker file per completed design if OVERWRITE_EXISTING is False
 
 # How to use:
 # 0. Configure export options in this script (below)
@@ -30,19 +31,33 @@ SKIP_PROJECT_NAMES = []  # If set, projects with names in this list are not expo
 EXPORT_PROJECT_NAMES = []  # If set, only projects with names in this list are exports. Leave empty to export all. Ignored if SKIP_PROJECT_NAMES is set.
 EXPORT_COMPONENT_FORMATS = ['stp', 'stl', 'igs']
 EXPORT_SCREENSHOT = True
+EXPORT_SCREENSHOT_SIZE = 512  # Width and height of the screenshot in pixels.
 EXPORT_SKETCHES = True
 EXPORT_BODIES = False  # Export each component body
 EXPORT_SUBCOMPONENTS = True
 MAX_SUBCOMPONENT_COUNT = 300  # more than this and we don't export subcomponents at all.
+# If False, existing files are kept and designs with an EXPORT_COMPLETE_SUFFIX marker are not opened again.
+# A design only gets the marker if none of its exports (including sketches and subcomponents) had an issue.
 OVERWRITE_EXISTING = True
 LOGGER_NAME = "Fusion360 Hub Exporter"
+EXPORT_COMPLETE_SUFFIX = ".exported"  # Marker file written next to each design exported without issues.
 
 # Imports
-from logging import Logger, FileHandler, Formatter
+from logging import Logger, FileHandler, Formatter, ERROR, INFO
+from logging.handlers import MemoryHandler
 from datetime import datetime
+from collections import deque
 import os
 import sys
 import re
+import functools
+import shutil
+import tempfile
+
+# Output paths are built by joining their parts with SEP instead of os.path.join.
+SEP = os.sep
+_NAME_RE = re.compile(r'[^a-zA-Z0-9 \n\.]')
+_FUSION_EXTENSIONS = frozenset(("f3d", "f3z"))
 
 try:
     # Wrap Fusion SDK import in try/except so we can log in case it fails.
@@ -58,11 +73,13 @@ try:
             self.data = self.app.data
             self.documents = self.app.documents
             self.log = Logger(LOGGER_NAME)
+            self.log.setLevel(INFO)
             self.num_issues = 0
             self.was_cancelled = False
             self.export_projects = EXPORT_PROJECT_NAMES
             self.skip_projects = SKIP_PROJECT_NAMES
             self.export_screenshot = EXPORT_SCREENSHOT
+            self.screenshot_size = EXPORT_SCREENSHOT_SIZE
             self.export_formats = ['stp', 'stl', 'igs']  # supported: ['stp', 'stl', 'igs']
             self.export_bodies = EXPORT_BODIES
             self.export_sketches = EXPORT_SKETCHES
@@ -70,6 +87,11 @@ try:
             self.max_subcomponent_count = MAX_SUBCOMPONENT_COUNT
             self.overwrite_existing = OVERWRITE_EXISTING
             self.progress_dialog = None
+            self._log_buffer = None
+            self._dir_contents = {}
+            self._created_paths = set()
+            self._folder_path_cache = {}
+            self._exported_components = set()
 
         def __enter__(self):
             return self
@@ -92,14 +114,20 @@ try:
             now = datetime.now().strftime('%Y-%m-%d')
             file_handler = FileHandler(os.path.join(output_path, 'Fusion360HubExporter_{}.log'.format(now)))
             file_handler.setFormatter(Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-            self.log.addHandler(file_handler)
+            # Buffer records so the log file isn't written for every line; errors flush immediately
+            # and the buffer is flushed after each design, so a crash loses at most one design's lines.
+            self._log_buffer = MemoryHandler(capacity=500, flushLevel=ERROR, target=file_handler)
+            self.log.addHandler(self._log_buffer)
 
-            self.log.info("Starting export.")
-            self.log.info("Python version: {}".format(sys.version))
+            try:
+                self.log.info("Starting export.")
+                self.log.info("Python version: %s", sys.version)
 
-            self._export_data(output_path)
+                self._export_data(output_path)
 
-            self.log.info("Done exporting!")
+                self.log.info("Done exporting!")
+            finally:
+                self._log_buffer.flush()
 
             if self.was_cancelled:
                 self.ui.messageBox("Cancelled!")
@@ -116,62 +144,66 @@ try:
             self.progress_dialog = self.ui.createProgressDialog()
             self.progress_dialog.show("Exporting data!", "", 0, 1, 1)
 
-            all_hubs = self.data.dataHubs
-            for hub_index in range(all_hubs.count):
-                hub = all_hubs.item(hub_index)
+            # Paths are joined with SEP, so drop a trailing separator (e.g. a drive root) once here.
+            root_folder = output_path.rstrip(SEP + (os.altsep or ""))
 
+            all_hubs = self.data.dataHubs
+            hub_count = all_hubs.count
+            for hub_index, hub in enumerate(all_hubs):
                 if hub.name == self.active_hub_name:
-                    self.log.info("Exporting hub \"{}\"".format(hub.name))
+                    self.log.info("Exporting hub \"%s\"", hub.name)
 
                     all_projects = hub.dataProjects
-                    for project_index in range(all_projects.count):
+                    project_count = all_projects.count
+                    for project_index, project in enumerate(all_projects):
                         if self.was_cancelled or self.progress_dialog.wasCancelled:
                             self.log.info("The process was cancelled!")
                             self.was_cancelled = True
                             return
 
-                        files = []
-                        project = all_projects.item(project_index)
-
                         if self.skip_projects and project.name in self.skip_projects:
-                            self.log.info("Skipping project \"{}\" as project in exclude list.".format(project.name))
+                            self.log.info("Skipping project \"%s\" as project in exclude list.", project.name)
                         elif self.export_projects and project.name not in self.export_projects:
-                            self.log.info("Not exporting project \"{}\" as not in include list.".format(project.name))
+                            self.log.info("Not exporting project \"%s\" as not in include list.", project.name)
                         else:
-                            self.log.info("Exporting project \"{}\"".format(project.name))
+                            self.log.info("Exporting project \"%s\"", project.name)
 
                             folder = project.rootFolder
 
-                            files.extend(self._get_files_for(folder))
-
                             self.progress_dialog.message = "Hub: {} of {}\nProject: {} of {}\nExporting design %v of %m".format(
                                 hub_index + 1,
-                                all_hubs.count,
+                                hub_count,
                                 project_index + 1,
-                                all_projects.count
+                                project_count
                             )
-                            self.progress_dialog.maximumValue = len(files)
+                            self.progress_dialog.maximumValue = 0
                             self.progress_dialog.reset()
 
-                            if not files:
+                            # Folders are listed as the export goes, so the first design is
+                            # exported without waiting for the whole project to be listed.
+                            file_count = 0
+                            for files in self._iter_files_for(folder):
+                                self.progress_dialog.maximumValue += len(files)
+                                for file in files:
+                                    if self.was_cancelled or self.progress_dialog.wasCancelled:
+                                        self.log.info("The process was cancelled!")
+                                        self.was_cancelled = True
+                                        return
+
+                                    file_count += 1
+                                    self.progress_dialog.progressValue = file_count
+                                    self._export_design(root_folder, file)
+
+                            if not file_count:
                                 self.log.info("No files to export for this project")
                                 continue
 
-                            for file_index in range(len(files)):
-                                if self.was_cancelled or self.progress_dialog.wasCancelled:
-                                    self.log.info("The process was cancelled!")
-                                    self.was_cancelled = True
-                                    return
-
-                                file: adsk.core.DataFile = files[file_index]
-                                self.progress_dialog.progressValue = file_index + 1
-                                self._export_design(output_path, file)
-                            self.log.info("Finished exporting project \"{}\".\n\n".format(project.name))
-                    self.log.info("Finished exporting hub \"{}\"\n".format(hub.name))
+                            self.log.info("Finished exporting project \"%s\".\n\n", project.name)
+                    self.log.info("Finished exporting hub \"%s\"\n", hub.name)
                 else:
                     self.log.info(
-                        "Skipping inactive hub \"{}\" - Fusion can only open documents from the active hub.".format(
-                            hub.name)
+                        "Skipping inactive hub \"%s\" - Fusion can only open documents from the active hub.",
+                        hub.name
                     )
 
         def _ask_for_output_path(self):
@@ -185,26 +217,49 @@ try:
 
             return output_path
 
-        def _get_files_for(self, folder):
-            files = []
+        def _iter_files_for(self, folder):
+            # Yields the files of one folder at a time, breadth first.
+            folders = deque([folder])
+            while folders:
+                current_folder = folders.popleft()
+                files = []
+                try:
+                    files.extend(current_folder.dataFiles)
+                    folders.extend(current_folder.dataFolders)
+                except Exception as e:
+                    self.log.error("Exception getting files: %s", e)
+
+                if files:
+                    yield files
+
+        def _export_design(self, root_folder, file: adsk.core.DataFile):
+            if file.fileExtension not in _FUSION_EXTENSIONS:
+                self.log.debug("Not exporting \"%s\" (file is not a Fusion Design)", file.name)
+                return
+
             try:
-                for file in folder.dataFiles:
-                    files.append(file)
+                file_folder_path = self._get_design_path(root_folder, file)
+            except Exception as ex:
+                self.num_issues += 1
+                self.log.error("Error working on %s: %s", file.name, ex)
+                return
 
-                for sub_folder in folder.dataFolders:
-                    files.extend(self._get_files_for(sub_folder))
-            except Exception as e:
-                self.log.error("Exception getting files: {}".format(e))
+            if not self.overwrite_existing and self._is_design_exported(file_folder_path, file):
+                self.log.info("Design \"%s\" already exported to \"%s\"", file.name, file_folder_path)
+                return
 
-            return files
+            self.log.info("Exporting design \"%s\"", file.name)
 
-        def _export_design(self, root_folder, file: adsk.core.DataFile):
-            if file.fileExtension != "f3d" and file.fileExtension != "f3z":
-                self.log.info("Not exporting \"{}\" (file is not a Fusion Design)".format(file.name))
+            document = self._open_design(file)
+            if document is None:
                 return
 
-            self.log.info("Exporting design \"{}\"".format(file.name))
+            try:
+                self._export_opened(file_folder_path, file, document)
+            finally:
+                self._close_design(file, document)
 
+        def _open_design(self, file: adsk.core.DataFile):
             document = None
             try:
                 document = self.documents.open(file)
@@ -213,55 +268,94 @@ try:
                 document.activate()
             except BaseException as ex:
                 self.num_issues += 1
-                self.log.exception("Opening {} failed!".format(file.name), exc_info=ex)
-                try:
-                    if document is not None:
-                        document.close(False)
-                except BaseException as ex:
-                    self.num_issues += 1
-                    self.log.exception("Failed to close \"{}\"".format(file.name), exc_info=ex)
-                return
-
-            try:
-                file_folder = file.parentFolder
-                file_folder_path = self._cleanup_name(file_folder.name)
-
-                while file_folder.parentFolder is not None:
-                    file_folder = file_folder.parentFolder
-                    file_folder_path = os.path.join(self._cleanup_name(file_folder.name), file_folder_path)
+                self.log.exception("Opening %s failed!", file.name, exc_info=ex)
+                self._close_design(file, document)
+                return None
 
-                parent_project = file_folder.parentProject
-                parent_hub = parent_project.parentHub
+            return document
 
-                file_folder_path = str(self._create_path(
-                    root_folder,
-                    "Hub {}".format(self._cleanup_name(parent_hub.name)),
-                    "Project {}".format(self._cleanup_name(parent_project.name)),
-                    file_folder_path,
-                    self._cleanup_name(file.name) + "." + file.fileExtension
-                ))
+        def _close_design(self, file: adsk.core.DataFile, document):
+            try:
+                if document is not None:
+                    document.close(False)
+            except BaseException as ex:
+                self.num_issues += 1
+                self.log.exception("Failed to close \"%s\"", file.name, exc_info=ex)
+            finally:
+                if self._log_buffer is not None:
+                    self._log_buffer.flush()
+
+        def _get_design_path(self, root_folder, file: adsk.core.DataFile):
+            parent_project = file.parentProject
+            parent_hub = parent_project.parentHub
+
+            path_parts = [
+                root_folder,
+                "Hub {}".format(self._cleanup_name(parent_hub.name)),
+                "Project {}".format(self._cleanup_name(parent_project.name)),
+            ]
+            folder_path = self._folder_path_for(file.parentFolder)
+            if folder_path:
+                path_parts.append(folder_path)
+            path_parts.append(self._cleanup_name(file.name) + "." + file.fileExtension)
+            return SEP.join(path_parts)
+
+        def _folder_path_for(self, folder: adsk.core.DataFolder):
+            folder_path = self._folder_path_cache.get(folder.id)
+            if folder_path is not None:
+                return folder_path
+
+            names = []
+            current_folder = folder
+            while current_folder is not None:
+                name = self._cleanup_name(current_folder.name)
+                if name:
+                    # Names made up only of unsupported characters clean up to "", skip them like os.path.join does.
+                    names.append(name)
+                current_folder = current_folder.parentFolder
+
+            folder_path = SEP.join(reversed(names))
+            self._folder_path_cache[folder.id] = folder_path
+            return folder_path
+
+        def _is_design_exported(self, file_folder_path, file: adsk.core.DataFile):
+            # Components can only be listed after opening the design, so a marker file
+            # written after an export without issues stands in for the complete export.
+            file_export_path = file_folder_path + SEP + self._cleanup_name(file.name)
+            if not self._file_exists(file_export_path + EXPORT_COMPLETE_SUFFIX):
+                return False
+            if self.export_screenshot and not self._file_exists(file_export_path + ".png"):
+                return False
+            return True
+
+        def _export_opened(self, file_folder_path, file: adsk.core.DataFile, document):
+            num_issues_before = self.num_issues
+            try:
+                self._create_path(file_folder_path)
 
                 if not os.path.exists(file_folder_path):
                     self.num_issues += 1
-                    self.log.exception("Couldn't make root folder\"{}\"".format(file_folder_path))
+                    self.log.exception("Couldn't make root folder\"%s\"", file_folder_path)
                     return
 
-                self.log.info("Writing to \"{}\"".format(file_folder_path))
-                file_export_path = os.path.join(file_folder_path, self._cleanup_name(file.name))
-                file_screenshot_path = os.path.join(file_folder_path, self._cleanup_name(file.name) + ".png")
+                self.log.info("Writing to \"%s\"", file_folder_path)
+                file_export_path = file_folder_path + SEP + self._cleanup_name(file.name)
+                file_screenshot_path = file_folder_path + SEP + self._cleanup_name(file.name) + ".png"
 
                 if self.export_screenshot:
-                    if self.overwrite_existing or not os.path.exists(file_screenshot_path):
+                    if self.overwrite_existing or not self._file_exists(file_screenshot_path):
                         try:
                             # write screenshot
                             self.app.activeViewport.refresh()
+                            # Always let the viewport repaint before it is captured
                             adsk.doEvents()
-                            self.app.activeViewport.saveAsImageFile(file_screenshot_path, 1024, 1024)
-                            self.log.info("Screenshot saved to \"{}\"".format(file_screenshot_path))
+                            self.app.activeViewport.saveAsImageFile(file_screenshot_path, self.screenshot_size, self.screenshot_size)
+                            self._mark_written(file_screenshot_path)
+                            self.log.info("Screenshot saved to \"%s\"", file_screenshot_path)
                         except Exception as e:
-                            self.log.warning("Error saving screenshot to {}: {}".format(file_screenshot_path, e))
+                            self.log.warning("Error saving screenshot to %s: %s", file_screenshot_path, e)
                     else:
-                        self.log.info("Screenshot file \"{}\" already exists.".format(file_screenshot_path))
+                        self.log.info("Screenshot file \"%s\" already exists.", file_screenshot_path)
 
                 try:
                     fusion_document: adsk.fusion.FusionDocument = adsk.fusion.FusionDocument.cast(document)
@@ -269,74 +363,120 @@ try:
                     export_manager: adsk.fusion.ExportManager = design.exportManager
 
                     # Write f3d/f3z file
-                    options = export_manager.createFusionArchiveExportOptions(file_export_path)
-                    export_manager.execute(options)
+                    self._write_archive(file_export_path, file, export_manager)
 
                     # Write components
+                    self._exported_components.clear()
                     try:
                         self._write_component(file_folder_path, design.rootComponent)
                     except Exception as e:
                         self.num_issues += 1
-                        self.log.error("Error saving components to {}: {}".format(file_folder_path, e))
+                        self.log.error("Error saving components to %s: %s", file_folder_path, e)
 
                 except Exception as e:
                     self.num_issues += 1
-                    self.log.error("Error saving design to {}: {}".format(file_export_path, e))
+                    self.log.error("Error saving design to %s: %s", file_export_path, e)
 
-                self.log.info("Finished exporting file \"{}\"".format(file.name))
+                if not self.overwrite_existing and self.num_issues == num_issues_before and not self.was_cancelled:
+                    self._write_export_complete(file_export_path + EXPORT_COMPLETE_SUFFIX)
+
+                self.log.info("Finished exporting file \"%s\"", file.name)
             except Exception as ex:
                 self.num_issues += 1
-                self.log.error("Error working on {}: {}".format(file.name, ex))
+                self.log.error("Error working on %s: %s", file.name, ex)
+
+        def _write_export_complete(self, file_path):
+            with open(file_path, 'w'):
+                pass
+            self._mark_written(file_path)
 
+        def _write_archive(self, file_export_path, file: adsk.core.DataFile,
+                           export_manager: adsk.fusion.ExportManager):
+            file_path = file_export_path + "." + file.fileExtension
+
+            if file.fileExtension == "f3d":
+                # The cloud copy of an f3d already is the archive, so download it rather than re-serialize the design.
+                if self._download_archive(file, file_path):
+                    self._mark_written(file_path)
+                    return
+
+            options = export_manager.createFusionArchiveExportOptions(file_export_path)
+            export_manager.execute(options)
+            self._mark_written(file_path)
+
+        def _download_archive(self, file: adsk.core.DataFile, file_path):
+            # DataFile.download saves into a folder under a name we don't control, so download into an
+            # empty temporary folder next to the target and only keep the result if it is a single .f3d file.
+            # DataFile.download is not available in older Fusion versions; the caller exports instead then.
+            download_path = tempfile.mkdtemp(prefix=".download_", dir=os.path.dirname(file_path))
+            try:
+                if not file.download(download_path, None):
+                    self.log.warning("Downloading \"%s\" failed, exporting it instead", file.name)
+                    return False
+
+                downloaded = [entry.path for entry in os.scandir(download_path) if entry.is_file()]
+                if len(downloaded) != 1 or not downloaded[0].lower().endswith(".f3d"):
+                    self.log.warning("Download of \"%s\" did not produce a single .f3d file, exporting it instead",
+                                     file.name)
+                    return False
+
+                os.replace(downloaded[0], file_path)
+                return os.path.isfile(file_path)
+            except Exception as e:
+                self.log.warning("Downloading \"%s\" failed, exporting it instead: %s", file.name, e)
+                return False
             finally:
-                try:
-                    if document is not None:
-                        document.close(False)
-                except BaseException as ex:
-                    self.num_issues += 1
-                    self.log.exception("Failed to close \"{}\"".format(file.name), exc_info=ex)
+                shutil.rmtree(download_path, ignore_errors=True)
 
         def _write_component(self, component_base_path, component: adsk.fusion.Component):
             if self.progress_dialog and self.progress_dialog.wasCancelled:
                 self.was_cancelled = True
                 return
 
-            self.log.info("Writing component \"{}\" to \"{}\"".format(component.name, component_base_path))
-            design = component.parentDesign
+            # Many occurrences can share one component (e.g. identical screws); export it only once.
+            if component.id in self._exported_components:
+                self.log.debug("Component \"%s\" already exported", component.name)
+                return
+            self._exported_components.add(component.id)
+
+            self.log.info("Writing component \"%s\" to \"%s\"", component.name, component_base_path)
+            export_manager = component.parentDesign.exportManager
 
-            output_path = os.path.join(component_base_path, self._cleanup_name(component.name))
+            output_path = component_base_path + SEP + self._cleanup_name(component.name)
 
             # Export Component
-            if 'stp' in self.export_formats:
-                try:
-                    self._write_step(output_path, component)
-                except Exception as e:
-                    self.log.error("Error saving STP for {}: {}".format(component.name, e))
-            if 'stl' in self.export_formats:
-                try:
-                    self._write_stl(output_path, component)
-                except Exception as e:
-                    self.log.error("Error saving STL for {}: {}".format(component.name, e))
-            if 'igs' in self.export_formats:
+            # Exports run one after another: the Fusion API may only be called from the main thread.
+            pending_exports = []
+            if not self._has_geometry(component):
+                self.log.debug("Component \"%s\" has no bodies or subcomponents, nothing to export", component.name)
+            else:
+                if 'stp' in self.export_formats:
+                    pending_exports.append(('STP', self._write_step))
+                if 'stl' in self.export_formats:
+                    pending_exports.append(('STL', self._write_stl))
+                if 'igs' in self.export_formats:
+                    pending_exports.append(('IGS', self._write_iges))
+
+            for format_name, write in pending_exports:
                 try:
-                    self._write_iges(output_path, component)
+                    write(output_path, component, export_manager)
                 except Exception as e:
-                    self.log.error("Error saving IGS for {}: {}".format(component.name, e))
+                    self.num_issues += 1
+                    self.log.error("Error saving %s for %s: %s", format_name, component.name, e)
 
             # Export Sketches
             if self.export_sketches:
-                sketches = component.sketches
-                for sketch_index in range(sketches.count):
+                for sketch in component.sketches:
                     sketch_path = ''
                     try:
-                        sketch = sketches.item(sketch_index)
-                        sketch_path = os.path.join(output_path, sketch.name)
+                        sketch_path = output_path + SEP + self._cleanup_name(sketch.name)
                         self._write_dxf(sketch_path, sketch)
                     except Exception as e:
+                        self.num_issues += 1
                         if sketch_path:
-                            self.log.error("Error saving sketch to {}: {}".format(sketch_path, e))
+                            self.log.error("Error saving sketch to %s: %s", sketch_path, e)
                         else:
-                            self.log.error("Error getting sketch from {}: {}".format(component.name, e))
+                            self.log.error("Error getting sketch from %s: %s", component.name, e)
 
             # Export Bodies
             if self.export_bodies:
@@ -345,20 +485,17 @@ try:
 
                 if bRepBodies.count > 0:
                     self._create_path(output_path)
-                    for index in range(bRepBodies.count):
+                    for body in bRepBodies:
                         if self.progress_dialog and self.progress_dialog.wasCancelled:
                             self.was_cancelled = True
                             return
-                        body = bRepBodies.item(index)
-                        self._write_stl_body(os.path.join(output_path, body.name), body)
+                        self._write_stl_body(output_path + SEP + self._cleanup_name(body.name), body, export_manager)
 
-                if meshBodies.count > 0:
-                    for index in range(meshBodies.count):
-                        if self.progress_dialog and self.progress_dialog.wasCancelled:
-                            self.was_cancelled = True
-                            return
-                        body = meshBodies.item(index)
-                        self._write_stl_body(os.path.join(output_path, body.name), body)
+                for body in meshBodies:
+                    if self.progress_dialog and self.progress_dialog.wasCancelled:
+                        self.was_cancelled = True
+                        return
+                    self._write_stl_body(output_path + SEP + self._cleanup_name(body.name), body, export_manager)
 
             # Export Subcomponent recursively
             if self.export_subcomponents:
@@ -367,103 +504,128 @@ try:
                 if subcomponent_count > self.max_subcomponent_count:
                     # This is to prevent getting stuck for hours on some PCB design with thousands of components.
                     self.log.info(
-                        "Component {} has {} subcomponents, which exceeds the set limit of {}. No subcomponents exported.".format(
-                            component.name, subcomponent_count, self.max_subcomponent_count))
+                        "Component %s has %s subcomponents, which exceeds the set limit of %s. No subcomponents exported.",
+                        component.name, subcomponent_count, self.max_subcomponent_count)
                 else:
-                    for occurrence_index in range(occurrences.count):
+                    for occurrence in occurrences:
                         if self.progress_dialog and self.progress_dialog.wasCancelled:
                             self.was_cancelled = True
                             return
                         sub_component_name = ''
                         try:
-                            occurrence = occurrences.item(occurrence_index)
                             sub_component = occurrence.component
                             sub_component_name = sub_component.name
-                            sub_path = self._create_path(component_base_path, self._cleanup_name(component.name))
+                            sub_path = self._create_path(output_path)
 
                             self._write_component(sub_path, sub_component)
                         except Exception as e:
+                            self.num_issues += 1
                             if sub_component_name:
-                                self.log.error("Error saving sub-component {}: {}".format(sub_component_name, e))
+                                self.log.error("Error saving sub-component %s: %s", sub_component_name, e)
                             else:
-                                self.log.error("Error getting sub-component from {}: {}".format(component.name, e))
+                                self.log.error("Error getting sub-component from %s: %s", component.name, e)
 
-        def _write_step(self, output_path, component: adsk.fusion.Component):
+        def _write_step(self, output_path, component: adsk.fusion.Component,
+                        export_manager: adsk.fusion.ExportManager):
             file_path = output_path + ".stp"
-            if not self.overwrite_existing and os.path.exists(file_path):
-                self.log.info("Step file \"{}\" already exists".format(file_path))
+            if not self.overwrite_existing and self._file_exists(file_path):
+                self.log.info("Step file \"%s\" already exists", file_path)
                 return
 
-            self.log.info("Writing step file \"{}\"".format(file_path))
-            export_manager = component.parentDesign.exportManager
+            self.log.info("Writing step file \"%s\"", file_path)
 
             options = export_manager.createSTEPExportOptions(output_path, component)
             export_manager.execute(options)
+            self._mark_written(file_path)
 
-        def _write_stl(self, output_path, component: adsk.fusion.Component):
+        def _write_stl(self, output_path, component: adsk.fusion.Component,
+                       export_manager: adsk.fusion.ExportManager):
             file_path = output_path + ".stl"
-            if not self.overwrite_existing and os.path.exists(file_path):
-                self.log.info("Stl file \"{}\" already exists".format(file_path))
+            if not self.overwrite_existing and self._file_exists(file_path):
+                self.log.info("Stl file \"%s\" already exists", file_path)
                 return
 
-            self.log.info("Writing stl file \"{}\"".format(file_path))
-            export_manager = component.parentDesign.exportManager
+            self.log.info("Writing stl file \"%s\"", file_path)
 
             try:
                 options = export_manager.createSTLExportOptions(component, output_path)
                 export_manager.execute(options)
+                self._mark_written(file_path)
             except BaseException as ex:
-                self.log.exception("Failed writing stl file \"{}\"".format(file_path), exc_info=ex)
-
-                if component.occurrences.count + component.bRepBodies.count + component.meshBodies.count > 0:
-                    self.num_issues += 1
+                self.log.exception("Failed writing stl file \"%s\"", file_path, exc_info=ex)
+                self.num_issues += 1
 
-        def _write_stl_body(self, output_path, body):
+        def _write_stl_body(self, output_path, body, export_manager: adsk.fusion.ExportManager):
             file_path = output_path + ".stl"
-            if not self.overwrite_existing and os.path.exists(file_path):
-                self.log.info("Stl body file \"{}\" already exists".format(file_path))
+            if not self.overwrite_existing and self._file_exists(file_path):
+                self.log.info("Stl body file \"%s\" already exists", file_path)
                 return
 
-            self.log.info("Writing stl body file \"{}\"".format(file_path))
-            export_manager = body.parentComponent.parentDesign.exportManager
+            self.log.info("Writing stl body file \"%s\"", file_path)
 
             try:
                 options = export_manager.createSTLExportOptions(body, file_path)
                 export_manager.execute(options)
+                self._mark_written(file_path)
             except BaseException:
                 # Probably an empty model, ignore it
                 pass
 
-        def _write_iges(self, output_path, component: adsk.fusion.Component):
+        def _write_iges(self, output_path, component: adsk.fusion.Component,
+                        export_manager: adsk.fusion.ExportManager):
             file_path = output_path + ".igs"
-            if not self.overwrite_existing and os.path.exists(file_path):
-                self.log.info("Iges file \"{}\" already exists".format(file_path))
+            if not self.overwrite_existing and self._file_exists(file_path):
+                self.log.info("Iges file \"%s\" already exists", file_path)
                 return
 
-            self.log.info("Writing iges file \"{}\"".format(file_path))
-
-            export_manager = component.parentDesign.exportManager
+            self.log.info("Writing iges file \"%s\"", file_path)
 
             options = export_manager.createIGESExportOptions(file_path, component)
             export_manager.execute(options)
+            self._mark_written(file_path)
 
         def _write_dxf(self, output_path, sketch: adsk.fusion.Sketch):
             file_path = output_path + ".dxf"
-            if not self.overwrite_existing and os.path.exists(file_path):
-                self.log.info("DXF sketch file \"{}\" already exists".format(file_path))
+            if not self.overwrite_existing and self._file_exists(file_path):
+                self.log.info("DXF sketch file \"%s\" already exists", file_path)
                 return
 
-            self.log.info("Writing dxf sketch file \"{}\"".format(file_path))
+            self.log.info("Writing dxf sketch file \"%s\"", file_path)
 
             sketch.saveAsDXF(file_path)
+            self._mark_written(file_path)
 
-        def _create_path(self, *path):
-            out_path = os.path.join(*path)
-            os.makedirs(out_path, exist_ok=True)
+        def _has_geometry(self, component: adsk.fusion.Component):
+            return component.bRepBodies.count > 0 or component.meshBodies.count > 0 or component.occurrences.count > 0
+
+        def _file_exists(self, file_path):
+            # List each output folder once instead of calling stat for every file
+            folder_path, file_name = os.path.split(file_path)
+            file_names = self._dir_contents.get(folder_path)
+            if file_names is None:
+                try:
+                    with os.scandir(folder_path) as entries:
+                        file_names = {entry.name for entry in entries if entry.is_file()}
+                except OSError:
+                    file_names = set()
+                self._dir_contents[folder_path] = file_names
+            return file_name in file_names
+
+        def _mark_written(self, file_path):
+            folder_path, file_name = os.path.split(file_path)
+            if folder_path in self._dir_contents:
+                self._dir_contents[folder_path].add(file_name)
+
+        def _create_path(self, out_path):
+            if out_path not in self._created_paths:
+                os.makedirs(out_path, exist_ok=True)
+                self._created_paths.add(out_path)
             return out_path
 
-        def _cleanup_name(self, name):
-            name = re.sub(r'[^a-zA-Z0-9 \n\.]', ' ', name).strip()
+        @staticmethod
+        @functools.lru_cache(maxsize=4096)
+        def _cleanup_name(name):
+            name = _NAME_RE.sub(' ', name).strip()
 
             if name.endswith('.stp') or name.endswith('.stl') or name.endswith('.igs'):
                 name = name[0: -4] + "_" + name[-3:]
@@ -490,5 +652,5 @@ except Exception as e:
     file_handler.setFormatter(Formatter('%(asctime)s - %(levelname)s - %(message)s'))
     errorlog = Logger(LOGGER_NAME)
     errorlog.addHandler(file_handler)
-    errorlog.error("Error in Fusion360HubExporter: {}".format(e))
+    errorlog.error("Error in Fusion360HubExporter: %s", e)
     exit(1)